@@ -1,83 +1,158 @@
 """
 This module contains database functionality for the application.
 """
-from enum import Enum, unique, auto
+import time
+from operator import attrgetter
+from types import MappingProxyType
 from data_updater.database_handler import DatabaseHandler
 from data_updater.thingsboard_adaptor import TelemetryMessage
 
 
-@unique
-class DeviceTableStatus(Enum):
-    """
-    This class is used to store device table status.
-    """
-    NEW = auto()
-    EXISTING = auto()
-
-
 class DatabaseAdaptor:
     """
     This module provides a functionality for exchanging delivered 
     message from device to PostgreSQL database.
     """
 
+    # The number of rows from which on COPY is preferred over INSERT.
+    BULK_COPY_THRESHOLD = 1000
+    # The name of the table holding the telemetry of all devices.
+    TELEMETRY_TABLE = "telemetry"
+    # The number of hash partitions of the telemetry table.
+    TELEMETRY_PARTITIONS = 8
+    # The name of the unlogged table the telemetry is written to before being merged.
+    STAGING_TABLE = "telemetry_staging"
+    # The minimum number of seconds between two merges of the staging table.
+    STAGING_MERGE_INTERVAL = 5
+    # The column names and types of the telemetry table.
+    COLUMN_TYPES = MappingProxyType({
+        "device_id": "TEXT NOT NULL",
+        "battery_percentage": "FLOAT",
+        "battery_timestamp": "BIGINT",
+        "gps_latitude": "FLOAT",
+        "gps_longitude": "FLOAT",
+        "gps_timestamp": "BIGINT",
+        "ai_normal_percentage": "INT",
+        "ai_error1_percentage": "INT",
+        "ai_error2_percentage": "INT",
+        "ai_error3_percentage": "INT",
+        "ai_timestamp": "BIGINT",
+    })
+    # The order of the telemetry table columns in the rows written to the database.
+    ORDERED_COLUMNS = tuple(COLUMN_TYPES)
+    # Reads the column values of a telemetry message, all columns but the device id.
+    _telemetry_values = attrgetter(*ORDERED_COLUMNS[1:])
+
     def __init__(self, database_handler: DatabaseHandler):
         self.database_handler = database_handler
+        # Holds the telemetry to be written, as one list of values per column.
+        self._staging: dict[str, list] = {column: [] for column in self.ORDERED_COLUMNS}
+        # Holds the monotonic time of the last merge of the staging table.
+        self._last_merge: float = float("-inf")
+        # Holds whether rows are written to the staging table since the last merge.
+        self._staging_table_filled: bool = False
+
+    def create_telemetry_table(self):
+        """
+        This function creates the telemetry table and its partitions in the database.
+        """
+        self.database_handler.create_table(
+            self.TELEMETRY_TABLE, self.COLUMN_TYPES, partition_key="device_id"
+        )
+        for remainder in range(self.TELEMETRY_PARTITIONS):
+            self.database_handler.create_hash_partition(
+                self.TELEMETRY_TABLE,
+                f"{self.TELEMETRY_TABLE}_{remainder}",
+                self.TELEMETRY_PARTITIONS,
+                remainder
+            )
+        # The staging table skips the write-ahead log, its rows are lost on a crash
+        # until they are merged into the telemetry table.
+        self.database_handler.create_unlogged_table_like(self.STAGING_TABLE, self.TELEMETRY_TABLE)
+
+    def add_telemetry(self, telemetries: list[tuple[str, TelemetryMessage]]):
+        """
+        This function stages the telemetry messages of the devices column by column,
+        and writes them to the staging table once enough rows are staged.
+        """
+        device_ids = self._staging[self.ORDERED_COLUMNS[0]]
+        value_columns = [self._staging[column] for column in self.ORDERED_COLUMNS[1:]]
+        for device_id, telemetry in telemetries:
+            device_ids.append(device_id.lower())
+            for column, value in zip(value_columns, self._telemetry_values(telemetry)):
+                column.append(value)
+
+        if len(device_ids) >= self.BULK_COPY_THRESHOLD:
+            self._write_staged_telemetry(self.STAGING_TABLE)
 
     @property
-    def device_table_column_names(self) -> dict[str, str]:
-        """
-        This function returns the column names of the device table.
-        """
-        return {
-                "battery_percentage": "FLOAT",
-                "battery_timestamp": "BIGINT",
-                "gps_latitude": "FLOAT",
-                "gps_longitude": "FLOAT",
-                "gps_timestamp": "BIGINT",
-                "ai_normal_percentage": "INT",
-                "ai_error1_percentage": "INT",
-                "ai_error2_percentage": "INT",
-                "ai_error3_percentage": "INT",
-                "ai_timestamp": "BIGINT",
-        }
+    def staging_merge_due(self) -> bool:
+        """
+        This function returns true if the staging table is to be merged,
+        i.e. it has rows and the merge interval has passed since the last merge.
+        """
+        return self._staging_table_filled and self._merge_interval_passed()
 
-    def telemetry_to_database_entry_converter(self, telemetry: TelemetryMessage) -> dict[str, str]:
-        """
-        This function converts the telemetry message to a database entry.
-        """
-        return {
-            "battery_percentage": telemetry.battery_percentage,
-            "battery_timestamp": telemetry.battery_timestamp,
-            "gps_latitude": telemetry.gps_latitude,
-            "gps_longitude": telemetry.gps_longitude,
-            "gps_timestamp": telemetry.gps_timestamp,
-            "ai_normal_percentage": telemetry.ai_normal_percentage,
-            "ai_error1_percentage": telemetry.ai_error1_percentage,
-            "ai_error2_percentage": telemetry.ai_error2_percentage,
-            "ai_error3_percentage": telemetry.ai_error3_percentage,
-            "ai_timestamp": telemetry.ai_timestamp,
-        }
+    def _merge_interval_passed(self) -> bool:
+        """
+        This function returns true if the merge interval has passed since the last merge.
+        """
+        return time.monotonic() - self._last_merge >= self.STAGING_MERGE_INTERVAL
 
-    def create_new_device_table(self, device_id: str) -> DeviceTableStatus:
+    def flush(self):
         """
-        This function creates a new device table in the database.
+        This function writes the remaining staged telemetry messages at the end of a poll,
+        directly to the telemetry table if a merge is due anyway.
         """
-        table_name = f"device_{device_id}"
-        if not self.database_handler.check_table_exists(table_name):
-            self.database_handler.create_table(table_name, self.device_table_column_names)
-            return DeviceTableStatus.NEW
-        return DeviceTableStatus.EXISTING
+        # Rows written to the staging table right before a merge would be written
+        # twice, e.g. on every run of a service polling only once.
+        if self._merge_interval_passed():
+            self._write_staged_telemetry(self.TELEMETRY_TABLE)
+        else:
+            self._write_staged_telemetry(self.STAGING_TABLE)
 
-    def add_telemetry(self, device_id: str, telemetry: TelemetryMessage):
+    def _write_staged_telemetry(self, table_name: str):
         """
-        This function inserts data to the device table.
+        This function writes the staged telemetry messages to the given table.
         """
-        table_name = f"device_{device_id}"
-        self.database_handler.insert_into_table(
-            table_name,
-            self.telemetry_to_database_entry_converter(telemetry)
-        )
+        row_count = len(self._staging[self.ORDERED_COLUMNS[0]])
+        if not row_count:
+            return
+        # Turn the staged columns into rows only while writing them.
+        rows = zip(*(self._staging[column] for column in self.ORDERED_COLUMNS))
+        try:
+            if row_count >= self.BULK_COPY_THRESHOLD:
+                self.database_handler.bulk_copy_into_table(
+                    table_name, self.ORDERED_COLUMNS, rows
+                )
+            else:
+                self.database_handler.insert_many_into_table(
+                    table_name, self.ORDERED_COLUMNS, list(rows)
+                )
+        finally:
+            self.discard_staged_telemetry()
+        if table_name == self.STAGING_TABLE:
+            self._staging_table_filled = True
+
+    def merge_staged_telemetry(self):
+        """
+        This function moves the rows of the staging table into the telemetry table.
+        """
+        self.database_handler.move_table_rows(self.STAGING_TABLE, self.TELEMETRY_TABLE)
+
+    def mark_staging_merged(self):
+        """
+        This function restarts the merge interval, once a merge is committed.
+        """
+        self._last_merge = time.monotonic()
+        self._staging_table_filled = False
+
+    def discard_staged_telemetry(self):
+        """
+        This function drops the staged telemetry messages without writing them.
+        """
+        for column in self._staging.values():
+            column.clear()
 
     def update_vehicles_data(self, device_id: str, telemetry: TelemetryMessage):
         """
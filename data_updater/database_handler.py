@@ -2,8 +2,16 @@
 This module defines an abstraction layer for accessing to database.
 """
 
+import contextlib
+import csv
+import functools
+import io
+import threading
+from collections.abc import Iterable, Mapping, Sequence
 from dataclasses import dataclass
 import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import execute_values
 
 
 def with_cursor(func):
@@ -12,15 +20,19 @@ def with_cursor(func):
     """
 
     def wrapper(self, *args, **kwargs):
+        # Reuse the cursor if it is already held, e.g. within a cursor scope.
+        if self.db_cursor:
+            return func(self, *args, **kwargs)
         self.acquire_cursor()
-        result = func(self, *args, **kwargs)
-        self.release_cursor()
-        return result
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            self.release_cursor()
 
     return wrapper
 
 
-@dataclass(kw_only=True)
+@dataclass(frozen=True, kw_only=True, slots=True)
 class DatabaseSettings:
     """This class holds the database settings."""
 
@@ -40,6 +52,9 @@ class DatabaseHandler:
         self.db_cursor = None
         # Holds the database settings.
         self.settings: DatabaseSettings = settings
+        # Holds the rendered bulk statements for each table and column list.
+        self._insert_sql_cache: dict[tuple[str, tuple[str, ...]], str] = {}
+        self._copy_sql_cache: dict[tuple[str, tuple[str, ...]], str] = {}
 
     def connect(self) -> None:
         """Connects to the database.
@@ -63,6 +78,18 @@ class DatabaseHandler:
         # Close the connection.
         self.db_conn.close()
 
+    def commit(self) -> None:
+        """Commit the current transaction.
+        :return: None
+        """
+        self.db_conn.commit()
+
+    def rollback(self) -> None:
+        """Roll back the current transaction.
+        :return: None
+        """
+        self.db_conn.rollback()
+
     def acquire_cursor(self) -> None:
         """Acquire the cursor.
         :return: None
@@ -77,6 +104,21 @@ class DatabaseHandler:
         self.db_cursor.close()
         self.db_cursor = None
 
+    @contextlib.contextmanager
+    def cursor_scope(self):
+        """Hold a single cursor for all database calls within the scope.
+        :return: The cursor.
+        """
+        # Leave an already held cursor to its owner.
+        if self.db_cursor:
+            yield self.db_cursor
+            return
+        self.acquire_cursor()
+        try:
+            yield self.db_cursor
+        finally:
+            self.release_cursor()
+
     @with_cursor
     def check_table_exists(self, table_name: str) -> bool:
         """Checks if there is a table with the given name in the database.
@@ -90,30 +132,140 @@ class DatabaseHandler:
         return exists
 
     @with_cursor
-    def create_table(self, table_name: str, columns: dict[str, str]) -> None:
-        """Create a table in the database."""
+    def create_table(self,
+                     table_name: str,
+                     columns: Mapping[str, str],
+                     partition_key: str | None = None) -> None:
+        """Create a table in the database.
+        :param table_name: The name of the table.
+        :param columns: The names and the data types of the columns.
+        :param partition_key: The column to hash partition the table by, if any.
+        """
         # Create the table using the constructed column definitions.
-        column_definitaions = ", ".join(
-            [f"{name} {datatype}" for name, datatype in columns.items()]
+        column_definitions = sql.SQL(", ").join(
+            sql.SQL("{} {}").format(sql.Identifier(name), sql.SQL(datatype))
+            for name, datatype in columns.items()
+        )
+        create_table_query = sql.SQL("CREATE TABLE IF NOT EXISTS {} ({})").format(
+            sql.Identifier(table_name), column_definitions
         )
-        create_table_query = f"CREATE TABLE IF NOT EXISTS {table_name} ({column_definitaions})"
+        if partition_key:
+            create_table_query += sql.SQL(" PARTITION BY HASH ({})").format(
+                sql.Identifier(partition_key)
+            )
 
         self.db_cursor.execute(create_table_query)
-        self.db_conn.commit()
-        self.db_conn.rollback()
+
+    @with_cursor
+    def create_hash_partition(self,
+                              table_name: str,
+                              partition_name: str,
+                              modulus: int,
+                              remainder: int) -> None:
+        """Create a hash partition of a partitioned table.
+        :param table_name: The name of the partitioned table.
+        :param partition_name: The name of the partition.
+        :param modulus: The number of partitions.
+        :param remainder: The hash remainder of the rows held by the partition.
+        """
+        create_partition_query = sql.SQL(
+            "CREATE TABLE IF NOT EXISTS {} PARTITION OF {} "
+            "FOR VALUES WITH (MODULUS {}, REMAINDER {})"
+        ).format(
+            sql.Identifier(partition_name),
+            sql.Identifier(table_name),
+            sql.Literal(modulus),
+            sql.Literal(remainder),
+        )
+        self.db_cursor.execute(create_partition_query)
+
+    @with_cursor
+    def create_unlogged_table_like(self, table_name: str, source_table: str) -> None:
+        """Create an unlogged table with the columns of another table.
+        :param table_name: The name of the table.
+        :param source_table: The name of the table to copy the columns from.
+        """
+        create_table_query = sql.SQL(
+            "CREATE UNLOGGED TABLE IF NOT EXISTS {} (LIKE {} INCLUDING DEFAULTS)"
+        ).format(sql.Identifier(table_name), sql.Identifier(source_table))
+        self.db_cursor.execute(create_table_query)
+
+    @with_cursor
+    def move_table_rows(self, source_table: str, target_table: str) -> None:
+        """Move all rows of a table into another table with the same columns.
+        :param source_table: The name of the table to be emptied.
+        :param target_table: The name of the table to receive the rows.
+        """
+        # Only the deleted rows are inserted, so rows committed concurrently
+        # to the source table are left there for the next move.
+        self.db_cursor.execute(
+            sql.SQL(
+                "WITH moved AS (DELETE FROM {} RETURNING *) INSERT INTO {} SELECT * FROM moved"
+            ).format(sql.Identifier(source_table), sql.Identifier(target_table))
+        )
 
     @with_cursor
     def insert_into_table(self, table_name: str, column_values: dict):
         """Insert values into a table dynamically."""
-        columns = ", ".join(column_values.keys())
-        placeholders = ", ".join(str(value) for value in column_values.values())
+        insert_query = sql.SQL("INSERT INTO {} ({}) VALUES ({})").format(
+            sql.Identifier(table_name),
+            sql.SQL(", ").join(map(sql.Identifier, column_values)),
+            sql.SQL(", ").join(sql.Placeholder() * len(column_values)),
+        )
         values = tuple(column_values.values())
 
-        insert_query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
-
         self.db_cursor.execute(insert_query, values)
-        self.db_conn.commit()
-        self.db_conn.rollback()
+
+    @with_cursor
+    def insert_many_into_table(self,
+                               table_name: str,
+                               columns: Sequence[str],
+                               rows: list[tuple]) -> None:
+        """Insert many rows into a table within a multi-row INSERT statement.
+        :param table_name: The name of the table.
+        :param columns: The names of the columns in the order of row values.
+        :param rows: The rows to be inserted, each one is a tuple of values.
+        :return: None
+        """
+        cache_key = (table_name, tuple(columns))
+        insert_query = self._insert_sql_cache.get(cache_key)
+        if insert_query is None:
+            insert_query = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+                sql.Identifier(table_name),
+                sql.SQL(", ").join(map(sql.Identifier, columns)),
+            ).as_string(self.db_cursor)
+            self._insert_sql_cache[cache_key] = insert_query
+        execute_values(self.db_cursor, insert_query, rows, page_size=1000)
+
+    @with_cursor
+    def bulk_copy_into_table(self,
+                             table_name: str,
+                             columns: Sequence[str],
+                             rows: Iterable[Sequence]) -> None:
+        """Copy many rows into a table within a single COPY command.
+        :param table_name: The name of the table.
+        :param columns: The names of the columns in the order of row values.
+        :param rows: The rows to be copied, each one is a sequence of values.
+        :return: None
+        """
+        # Serialize the rows as tab separated values; None becomes an empty field,
+        # which is read back as NULL by the CSV format of COPY.
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter="\t", quoting=csv.QUOTE_MINIMAL)
+        writer.writerows(rows)
+        buffer.seek(0)
+
+        cache_key = (table_name, tuple(columns))
+        copy_query = self._copy_sql_cache.get(cache_key)
+        if copy_query is None:
+            copy_query = sql.SQL(
+                "COPY {} ({}) FROM STDIN WITH (FORMAT csv, DELIMITER E'\\t')"
+            ).format(
+                sql.Identifier(table_name),
+                sql.SQL(", ").join(map(sql.Identifier, columns)),
+            ).as_string(self.db_cursor)
+            self._copy_sql_cache[cache_key] = copy_query
+        self.db_cursor.copy_expert(copy_query, buffer)
 
     @with_cursor
     def get_columns_from_table(
@@ -158,23 +310,27 @@ class DatabaseHandler:
         self.db_cursor.execute(
             f"UPDATE {table_name} SET {column_name}={new_value} WHERE {where_clause}"
         )
-        self.db_conn.commit()
-        self.db_conn.rollback()
 
-# This is a singleton pattern implementation.
-def create_database_handler(settings: DatabaseSettings = None) -> DatabaseHandler:
+# Guards the creation of the DatabaseHandler instances.
+_database_handler_lock = threading.Lock()
+
+
+@functools.cache
+def _cached_database_handler(settings: DatabaseSettings) -> DatabaseHandler:
+    """Creates the DatabaseHandler instance of the given settings."""
+    return DatabaseHandler(settings)
+
+
+def create_database_handler(settings: DatabaseSettings) -> DatabaseHandler:
     """Factory function for creating a DatabaseHandler instance
-    only once as a singleton object.
+    only once per database settings.
 
     :param settings: The database settings.
     :return: The DatabaseHandler instance.
     """
-    if not hasattr(create_database_handler, "database_handler"):
-        # If settings are not provided, raise an error.
-        if not settings:
-            raise ValueError("Database settings not provided.")
-        # Create the DatabaseHandler instance.
-        create_database_handler.database_handler = DatabaseHandler(settings)
-
-    # Return the DatabaseHandler instance that is created before.
-    return create_database_handler.database_handler
+    # If settings are not provided, raise an error.
+    if not settings:
+        raise ValueError("Database settings not provided.")
+    # The cache alone may create the instance twice for concurrent callers.
+    with _database_handler_lock:
+        return _cached_database_handler(settings)
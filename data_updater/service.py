@@ -1,6 +1,8 @@
 """
 This module provides the main service functionality.
 """
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dotenv import dotenv_values
 from data_updater.thingsboard_adaptor import ThingsBoardSettings
 from data_updater.database_handler import DatabaseSettings
@@ -15,6 +17,9 @@ class DataUpdaterService:
     This module provides the main service functionality.
     """
 
+    # The number of telemetry requests sent to ThingsBoard concurrently.
+    TELEMETRY_WORKERS = 16
+
     def __init__(self,
                  database_env: str = ".database.env",
                  thingsboard_env: str = ".thingsboard.env"):
@@ -38,36 +43,81 @@ class DataUpdaterService:
         )
 
         # Connect to the database.
-        database_handler = create_database_handler(database_settings)
-        database_handler.connect()
-        self.database_adaptor = DatabaseAdaptor(database_handler)
+        self.database_handler = create_database_handler(database_settings)
+        self.database_handler.connect()
+        self.database_adaptor = DatabaseAdaptor(self.database_handler)
+        with self.database_handler.cursor_scope():
+            self.database_adaptor.create_telemetry_table()
+            self.database_handler.commit()
 
         # Connect to the ThingsBoard service.
-        self.thingsboard_connector = ThingsBoardAdaptor(thingsboard_settings)
+        self.thingsboard_connector = ThingsBoardAdaptor(
+            thingsboard_settings, concurrent_requests=self.TELEMETRY_WORKERS
+        )
         self.thingsboard_connector.connect()
 
     def run(self):
         """Run the service."""
-        # Get all telemetry messages from ThingsBoard.
-        telemetry_messages = self._get_all_telemetry()
-        # Add the telemetry messages to the database.
-        for each_telemetry in telemetry_messages:
-            self.database_adaptor.create_new_device_table(each_telemetry["device"].name)
-            self.database_adaptor.add_telemetry(
-                device_id=each_telemetry["device"].name,
-                telemetry=each_telemetry["telemetry"]
-            )
+        devices = self.thingsboard_connector.get_project_devices()
+        # Add the telemetry messages to the database within a single transaction,
+        # while the telemetry of the remaining devices is still being fetched.
+        with self.database_handler.cursor_scope():
+            try:
+                for telemetry_messages in self._iter_telemetry_batches(devices):
+                    self._write_telemetry(telemetry_messages)
+                self.database_adaptor.flush()
+                self.database_handler.commit()
+            except Exception:
+                self.database_handler.rollback()
+                self.database_adaptor.discard_staged_telemetry()
+                raise
+
+            # Merge the staging table within its own transaction, apart from the writes.
+            if self.database_adaptor.staging_merge_due:
+                try:
+                    self.database_adaptor.merge_staged_telemetry()
+                    self.database_handler.commit()
+                except Exception:
+                    self.database_handler.rollback()
+                    raise
+                self.database_adaptor.mark_staging_merged()
+
+    def _iter_telemetry_batches(
+        self, devices: list[ThingsBoardDevice]
+    ) -> Iterator[list[tuple[ThingsBoardDevice, TelemetryMessage]]]:
+        """Yields the telemetry messages from ThingsBoard for each device in batches,
+        as soon as they are received.
+        """
+        if not devices:
+            return
+        # Fetch the telemetry of all devices at once if the service supports it.
+        telemetry_list = self.thingsboard_connector.get_devices_telemetry(devices)
+        if telemetry_list is not None:
+            yield list(zip(devices, telemetry_list))
+            return
+        # The requests are independent from each other, so send them concurrently.
+        executor = ThreadPoolExecutor(max_workers=self.TELEMETRY_WORKERS)
+        try:
+            pending = {
+                executor.submit(self.thingsboard_connector.get_device_telemetry, device): device
+                for device in devices
+            }
+            while pending:
+                # Hand over everything received so far, the rest keeps arriving meanwhile.
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield [(pending.pop(future), future.result()) for future in done]
+        finally:
+            # Drop the queued requests instead of waiting for them if the poll is aborted.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _write_telemetry(self,
+                         telemetry_messages: list[tuple[ThingsBoardDevice, TelemetryMessage]]):
+        """Writes the telemetry messages to the database."""
+        self.database_adaptor.add_telemetry(
+            [(device.name, telemetry) for device, telemetry in telemetry_messages]
+        )
+        for device, telemetry in telemetry_messages:
             self.database_adaptor.update_vehicles_data(
-                device_id=each_telemetry["device"].name,
-                telemetry=each_telemetry["telemetry"]
+                device_id=device.name,
+                telemetry=telemetry
             )
-
-    def _get_all_telemetry(self) -> dict[str, ThingsBoardDevice | list[TelemetryMessage]]:
-        """Returns all telemetry messages from ThingsBoard for each device."""
-        devices = self.thingsboard_connector.get_project_devices()
-        telemetry_messages = []
-        for each_device in devices:
-            telemetry = self.thingsboard_connector.get_device_telemetry(devices[0])
-            telemetry_messages.append({"device": each_device, "telemetry": telemetry})
-        return telemetry_messages
-    
\ No newline at end of file
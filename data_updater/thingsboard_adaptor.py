@@ -2,9 +2,9 @@
 This module contains connector functionality for ThingsBoard.
 """
 from dataclasses import dataclass
-import json
-from tb_rest_client import RestClientCE
-from tb_rest_client.models.models_ce import EntityId
+import orjson
+import requests
+from data_updater.thingsboard_http import ThingsBoardHTTP
 
 
 @dataclass
@@ -15,14 +15,14 @@ class ThingsBoardSettings:
     password: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ThingsBoardDevice:
     """Holds the device details from ThingsBoard."""
     name: str
     id: str
 
 
-@dataclass
+@dataclass(slots=True)
 class TelemetryMessage:
     """Holds the telemetry message from ThingsBoard."""
     # Battery details
@@ -58,65 +58,125 @@ class ThingsBoardAdaptor:
     An adaptor layer between the Python applications and the ThingsBoard service. 
     """
 
-    def __init__(self, settings: ThingsBoardSettings):
+    # The type of the devices that belong to the project.
+    DEVICE_TYPE = "DieselMotor"
+    # The number of devices requested per page.
+    DEVICE_PAGE_SIZE = 100
+    # The timeseries keys of the telemetry messages.
+    TELEMETRY_KEYS = ["bat", "gnss", "dev", "env", "ai"]
+    # The status codes of the services that do not support entity data queries.
+    BULK_UNSUPPORTED_STATUS_CODES = (
+        requests.codes.bad_request,
+        requests.codes.not_found,
+        requests.codes.method_not_allowed,
+    )
+
+    def __init__(self, settings: ThingsBoardSettings, concurrent_requests: int = 1):
         """
-        Initialize the adaptor object.
+        Initialize the adaptor object, able to send the given number of
+        requests concurrently over kept-alive connections.
         """
         self.user_name: str = settings.username
         self.password: str = settings.password
-        self.thingsboard_client: RestClientCE = RestClientCE(settings.url)
+        self.thingsboard_client: ThingsBoardHTTP = ThingsBoardHTTP(
+            settings.url, pool_size=concurrent_requests
+        )
+        # Holds whether the telemetry of many devices can be fetched at once.
+        self.bulk_telemetry_supported: bool = True
 
     def connect(self):
         """Connects to the ThingsBoard service."""
-        self.thingsboard_client.login(self.user_name, self.password)
-        if not self.thingsboard_client.logged_in:
-            raise ValueError("Cannot log in to the service. Check username or password.")
+        try:
+            self.thingsboard_client.login(self.user_name, self.password)
+        except requests.HTTPError as error:
+            raise ValueError("Cannot log in to the service. Check username or password.") from error
 
     def get_project_devices(self) -> list[ThingsBoardDevice]:
         """
         Get all devices from ThingsBoard.
         """
-        # Find the total number of devices.
-        total_elements = self.thingsboard_client.get_tenant_devices(1, 1).total_elements
-        total_elements = int(total_elements)
-
-        # Getting all device informations.
+        # Getting all device informations page by page.
         devices = []
-        for device_index in range(0, total_elements):
-            response = self.thingsboard_client.get_tenant_devices(1, device_index)
-            for next_device in response.data:
-                if next_device.type == "DieselMotor":
-                    devices.append(ThingsBoardDevice(name=str(next_device.name),
-                                                     id=str(next_device.id.id)))
+        page = 0
+        while True:
+            response = self.thingsboard_client.get_tenant_devices(
+                self.DEVICE_PAGE_SIZE, page, device_type=self.DEVICE_TYPE
+            )
+            for next_device in response["data"]:
+                if next_device["type"] == self.DEVICE_TYPE:
+                    devices.append(ThingsBoardDevice(name=str(next_device["name"]),
+                                                     id=str(next_device["id"]["id"])))
+            if not response["hasNext"]:
+                break
+            page += 1
         return devices
 
-    def get_device_telemetry(self, device: ThingsBoardDevice) -> list[str]:
+    def get_device_telemetry(self, device: ThingsBoardDevice) -> TelemetryMessage:
         """
         Get all telemetry data from the given device.
         """
-        entity = EntityId(id=device.id, entity_type="DEVICE")
-        telemetry_message = self.thingsboard_client.get_latest_timeseries(entity)
+        telemetry_message = self.thingsboard_client.get_latest_timeseries(
+            device.id, self.TELEMETRY_KEYS
+        )
+        return self._parse_telemetry(telemetry_message)
+
+    def get_devices_telemetry(self,
+                              devices: list[ThingsBoardDevice]) -> list[TelemetryMessage] | None:
+        """
+        Get all telemetry data from the given devices within a single query.
+        Returns None if the service does not support such queries.
+        """
+        if not self.bulk_telemetry_supported:
+            return None
+        try:
+            telemetry_messages = self.thingsboard_client.get_latest_timeseries_bulk(
+                [device.id for device in devices], self.TELEMETRY_KEYS
+            )
+        except requests.HTTPError as error:
+            if error.response.status_code not in self.BULK_UNSUPPORTED_STATUS_CODES:
+                raise
+            # Older services fall back to the per device requests from now on.
+            self.bulk_telemetry_supported = False
+            return None
+        # Devices missing from the query result are requested on their own.
+        return [
+            self._parse_telemetry(telemetry_messages[device.id])
+            if device.id in telemetry_messages else self.get_device_telemetry(device)
+            for device in devices
+        ]
+
+    @staticmethod
+    def _parse_telemetry(telemetry_message: dict) -> TelemetryMessage:
+        """
+        Parse the latest timeseries of a device into a telemetry message.
+        """
+        # Parse each telemetry value only once.
+        battery = orjson.loads(telemetry_message["bat"][0]["value"])
+        gnss = orjson.loads(telemetry_message["gnss"][0]["value"])
+        development = orjson.loads(telemetry_message["dev"][0]["value"])
+        environmental = orjson.loads(telemetry_message["env"][0]["value"])
+        ai = orjson.loads(telemetry_message["ai"][0]["value"])
 
         return TelemetryMessage(
-            battery_percentage=json.loads(telemetry_message["bat"][0]["value"])["v"],
-            battery_timestamp=json.loads(telemetry_message["bat"][0]["value"])["ts"],
-            gps_latitude=json.loads(telemetry_message["gnss"][0]["value"])["lat"],
-            gps_longitude=json.loads(telemetry_message["gnss"][0]["value"])["lng"],
-            gps_speed=json.loads(telemetry_message["gnss"][0]["value"])["spd"],
+            battery_percentage=battery["v"],
+            battery_timestamp=battery["ts"],
+            gps_latitude=gnss["lat"],
+            gps_longitude=gnss["lng"],
+            gps_speed=gnss["spd"],
             gps_timestamp=telemetry_message["gnss"][0]["ts"],
-            cellular_imei=json.loads(telemetry_message["dev"][0]["value"])["imei"],
-            cellular_iccid=json.loads(telemetry_message["dev"][0]["value"])["iccid"],
-            firmware_version=json.loads(telemetry_message["dev"][0]["value"])["modV"],
-            board_version=json.loads(telemetry_message["dev"][0]["value"])["brdV"],
-            application_version=json.loads(telemetry_message["dev"][0]["value"])["appV"],
-            development_timestamp=json.loads(telemetry_message["dev"][0]["value"])["ts"],
-            environmental_temperature=json.loads(telemetry_message["env"][0]["value"])["temp"],
-            environmental_humidity=json.loads(telemetry_message["env"][0]["value"])["hum"],
-            environmental_pressure=json.loads(telemetry_message["env"][0]["value"])["atmp"],
-            environmental_timestamp=json.loads(telemetry_message["env"][0]["value"])["ts"],
-            ai_normal_percentage=json.loads(telemetry_message["ai"][0]["value"])["n"],
-            ai_error1_percentage=json.loads(telemetry_message["ai"][0]["value"])["e1"],
-            ai_error2_percentage=json.loads(telemetry_message["ai"][0]["value"])["e2"],
-            ai_error3_percentage=json.loads(telemetry_message["ai"][0]["value"])["e3"],
-            ai_timestamp=json.loads(telemetry_message["ai"][0]["value"])["ts"]
+            cellular_imei=development["imei"],
+            cellular_iccid=development["iccid"],
+            firmware_version=development["modV"],
+            board_version=development["brdV"],
+            application_version=development["appV"],
+            development_timestamp=development["ts"],
+            environmental_temperature=environmental["temp"],
+            environmental_humidity=environmental["hum"],
+            environmental_pressure=environmental["atmp"],
+            environmental_timestamp=environmental["ts"],
+            ai_normal_percentage=ai["n"],
+            ai_error1_percentage=ai["e1"],
+            ai_error2_percentage=ai["e2"],
+            ai_error3_percentage=ai["e3"],
+            ai_timestamp=ai["ts"]
         )
@@ -0,0 +1,183 @@
+"""
+This module defines a lightweight HTTP client for the ThingsBoard REST API.
+"""
+import base64
+import threading
+import time
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class ThingsBoardHTTP:
+    """This class handles all HTTP interactions with the ThingsBoard service
+    over a single pooled keep-alive session.
+    """
+
+    # The number of seconds to wait for the service to respond.
+    TIMEOUT = 10
+    # The number of seconds before its expiry the token is renewed.
+    TOKEN_EXPIRY_MARGIN = 30
+    # The number of devices requested within a single entity data query.
+    ENTITY_PAGE_SIZE = 100
+
+    def __init__(self, url: str, pool_size: int) -> None:
+        """
+        :param url: The base address of the service.
+        :param pool_size: The number of connections kept alive to the service,
+            at least the number of threads sending requests concurrently.
+        """
+        # Holds the base address of the service.
+        self.url: str = url.rstrip("/")
+        # Holds the credentials to log in again when the token expires.
+        self.username: str | None = None
+        self.password: str | None = None
+        # Holds the token and its expiry time on the monotonic clock.
+        self._jwt: str | None = None
+        self._jwt_exp: float = 0
+        # Guards the token so that concurrent requests log in only once.
+        self._jwt_lock = threading.Lock()
+        # Holds the session that keeps the connections alive between requests.
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=pool_size))
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=pool_size))
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip",
+        })
+
+    def login(self, username: str, password: str) -> None:
+        """Logs in to the service and keeps the token for the next requests.
+        :param username: The name of the user.
+        :param password: The password of the user.
+        :return: None
+        """
+        with self._jwt_lock:
+            self.username = username
+            self.password = password
+            self._login()
+
+    def get_tenant_devices(self,
+                           page_size: int,
+                           page: int,
+                           device_type: str | None = None) -> dict:
+        """Returns a page of the tenant devices.
+        :param page_size: The number of devices in a page.
+        :param page: The index of the page.
+        :param device_type: The type of the devices, all types if not given.
+        :return: The page data with the "data" and "hasNext" fields.
+        """
+        params = {"pageSize": page_size, "page": page}
+        if device_type:
+            params["type"] = device_type
+        return self._request("GET", "/api/tenant/devices", params=params)
+
+    def get_latest_timeseries(self, device_id: str, keys: list[str] | None = None) -> dict:
+        """Returns the latest values of the device timeseries.
+        :param device_id: The id of the device.
+        :param keys: The timeseries keys, all keys if not given.
+        :return: The list of "ts" and "value" pairs for each key.
+        """
+        params = {"keys": ",".join(keys)} if keys else None
+        return self._request(
+            "GET", f"/api/plugins/telemetry/DEVICE/{device_id}/values/timeseries", params=params
+        )
+
+    def get_latest_timeseries_bulk(self,
+                                   device_ids: list[str],
+                                   keys: list[str]) -> dict[str, dict]:
+        """Returns the latest values of the timeseries of many devices
+        with an entity data query per ENTITY_PAGE_SIZE devices.
+        :param device_ids: The ids of the devices.
+        :param keys: The timeseries keys.
+        :return: The timeseries of each device id, in the same format as
+            the result of get_latest_timeseries.
+        """
+        timeseries = {}
+        # One single page query per slice of devices, so that neither the device list
+        # is resent for every page nor the pages depend on the order of the results.
+        for start in range(0, len(device_ids), self.ENTITY_PAGE_SIZE):
+            device_ids_slice = device_ids[start:start + self.ENTITY_PAGE_SIZE]
+            query = {
+                "entityFilter": {
+                    "type": "entityList",
+                    "entityType": "DEVICE",
+                    "entityList": device_ids_slice,
+                },
+                "latestValues": [{"type": "TIME_SERIES", "key": key} for key in keys],
+                "pageLink": {"page": 0, "pageSize": len(device_ids_slice)},
+            }
+            response = self._request("POST", "/api/entitiesQuery/find", json=query)
+            for entity in response["data"]:
+                latest = entity["latest"].get("TIME_SERIES", {})
+                timeseries[entity["entityId"]["id"]] = {
+                    key: [{"ts": value["ts"], "value": value["value"]}]
+                    for key, value in latest.items()
+                }
+        return timeseries
+
+    def _login(self) -> None:
+        """Obtains a new token with the kept credentials."""
+        self._jwt = None
+        response = self.session.post(
+            f"{self.url}/api/auth/login",
+            json={"username": self.username, "password": self.password},
+            timeout=self.TIMEOUT,
+        )
+        response.raise_for_status()
+        token = orjson.loads(response.content)["token"]
+        self._jwt_exp = time.monotonic() + self._token_lifetime(token)
+        self._jwt = token
+
+    def _ensure_logged_in(self) -> str:
+        """Returns a valid token, logging in again only if the token is
+        missing or about to expire.
+        """
+        with self._jwt_lock:
+            if self._jwt is None or time.monotonic() >= self._jwt_exp - self.TOKEN_EXPIRY_MARGIN:
+                self._login()
+            return self._jwt
+
+    def _invalidate_token(self, token: str) -> None:
+        """Drops the given token unless it has already been renewed."""
+        with self._jwt_lock:
+            if self._jwt == token:
+                self._jwt = None
+
+    def _request(self,
+                 method: str,
+                 path: str,
+                 params: dict | None = None,
+                 json: dict | None = None) -> dict:
+        """Sends a request and returns the decoded response body.
+        The request is retried once after logging in again if the token
+        is rejected.
+        """
+        for attempt in range(2):
+            token = self._ensure_logged_in()
+            response = self.session.request(
+                method,
+                f"{self.url}{path}",
+                params=params,
+                json=json,
+                headers={"X-Authorization": f"Bearer {token}"},
+                timeout=self.TIMEOUT,
+            )
+            if response.status_code != requests.codes.unauthorized or attempt:
+                break
+            self._invalidate_token(token)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+    @staticmethod
+    def _token_lifetime(token: str) -> float:
+        """Returns the number of seconds until the token expires, read from
+        its "exp" claim. The token is assumed not to expire if the claim
+        cannot be read; a rejected request renews it then.
+        """
+        try:
+            payload = token.split(".")[1]
+            claims = orjson.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+            return float(claims["exp"]) - time.time()
+        except (IndexError, KeyError, TypeError, ValueError):
+            return float("inf")